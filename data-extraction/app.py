@@ -12,8 +12,11 @@ ENV = {
     'region': os.environ['CDK_DEFAULT_REGION']
     }
 environment = app.node.try_get_context("environment")
+snapshot_bucket = app.node.try_get_context("snapshot_bucket")
+snapshot_prefix = app.node.try_get_context("snapshot_prefix") or "snapshots/"
 DataExtractionStack(app, "DataExtractionStack", 
-                    environment=environment, code_directory="lambda/", env=ENV
+                    environment=environment, code_directory="lambda/", env=ENV,
+                    snapshot_bucket=snapshot_bucket, snapshot_prefix=snapshot_prefix
     # If you don't specify 'env', this stack will be environment-agnostic.
     # Account/Region-dependent features and context lookups will not work,
     # but a single synthesized template can be deployed anywhere.
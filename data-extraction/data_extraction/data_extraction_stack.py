@@ -15,7 +15,8 @@ from aws_cdk import Stack, BundlingOptions, Environment
 class DataExtractionStack(Stack):
 
     def __init__(
-        self, scope: Construct, construct_id: str, environment: str, code_directory:str, **kwargs
+        self, scope: Construct, construct_id: str, environment: str, code_directory:str,
+        snapshot_bucket:str=None, snapshot_prefix:str='snapshots/', **kwargs
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
         self.role = Role(self, "ExecutionRole",
@@ -49,6 +50,17 @@ class DataExtractionStack(Stack):
                         ]
                     )
                 })
+        lambda_environment = {'environment': environment}
+        if snapshot_bucket:
+            # the snapshot can only be published under the configured bucket/prefix
+            self.role.add_to_policy(
+                PolicyStatement(
+                    actions=['s3:PutObject', 's3:AbortMultipartUpload'],
+                    effect=Effect.ALLOW,
+                    resources=[f'arn:aws:s3:::{snapshot_bucket}/{snapshot_prefix}*']
+                )
+            )
+            lambda_environment.update({'snapshot_bucket': snapshot_bucket, 'snapshot_prefix': snapshot_prefix})
 
         vpc = Vpc.from_lookup(
                 self, f"ImportVPC",
@@ -79,7 +91,7 @@ class DataExtractionStack(Stack):
             # ],
             vpc=vpc,
             vpc_subnets=SubnetSelection(subnets=selection.subnets),
-            environment={'environment': environment}
+            environment=lambda_environment
             )
         self.event_rule = Rule(
                 self,
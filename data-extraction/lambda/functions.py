@@ -1,7 +1,8 @@
 from urllib.request import urlopen
 from zipfile import ZipFile
 from io import BytesIO
-import json, sqlite3, os, warnings, re
+from pathlib import Path
+import json, sqlite3, os, warnings, re, time
 
 def extract_raw_data(hyperlink: str) -> tuple:
     """Download the data from the data source (https://cricsheet.org/) 
@@ -77,6 +78,114 @@ def build_sql_insert_statement(table_name: str, columns: str, values: str) -> st
     insert_statement = sql_raw_statement.format(table_name=table_name, columns=columns, values=values)
     return insert_statement
 
+def check_sqlite_filename(database:str):
+    """Warn if the SQLite database filename doesn't end with a recommended extension
+
+    Args:
+        database (str): SQLite directory, i.e.: data.db
+    """    
+    if re.search(r'\.(sqlite|sqlite3|db|db3|s3db|sl3|sql)$', database) is None:
+        warnings.warn("Sqlite database filename is recommended to end with .sqlite, .sqlite3, .db, .db3, .s3db, .sl3, .sql")
+
+def build_sql_index_statement(table_name: str, columns: list) -> str:
+    """Configure a create index query in SQL, which is the format of 
+    "CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns});"
+    The index name is derived from the table name and the indexed columns, i.e.: idx_innings_team
+
+    Args:
+        table_name (str): the table name to be indexed.
+        columns (list): column names to be included in the index, in order.
+
+    Returns:
+        str: complete query
+    """    
+    __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+    sql_raw_statement = open(
+        os.path.join(__location__, "queries/index.sql")
+    ).read()
+    index_name = f"idx_{table_name}_{'_'.join(columns)}"
+    index_statement = sql_raw_statement.format(index_name=index_name, table_name=table_name, columns=', '.join(columns))
+    return index_statement
+
+def build_snapshot(database:str, statements:list, indexes:list=None, page_size:int=65536) -> dict:
+    """Build an immutable, read-optimized SQLite snapshot file from scratch.
+    The statements are bulk-loaded in one transaction with journaling disabled, so the rows
+    are expected to be passed in sorted primary key order. Afterwards the indexes are created,
+    the statistics are collected (ANALYZE) and the file is compacted (VACUUM) before it is
+    made read-only and moved into place.
+
+    Args:
+        database (str): SQLite directory of the snapshot, i.e.: snapshot.db. An existing file is replaced.
+        statements (list): SQL queries that create and populate the tables, executed in order.
+        indexes (list, optional): (table_name, columns) pairs of the secondary indexes to create. Defaults to None.
+        page_size (int, optional): database page size in bytes, a power of two between 512 and 65536; larger pages favour sequential scans. Defaults to 65536.
+
+    Raises:
+        ValueError: if page_size is not a page size SQLite supports
+
+    Returns:
+        dict: build statistics of the snapshot, including build_seconds, size_bytes and page_size
+    """    
+    # SQLite silently ignores unsupported page sizes
+    if page_size not in [2 ** exponent for exponent in range(9, 17)]:
+        raise ValueError(f"page_size must be a power of two between 512 and 65536, got {page_size}")
+    check_sqlite_filename(database)
+    start = time.perf_counter()
+    # build next to the target so the final rename is atomic
+    staging = database + '.tmp'
+    if os.path.exists(staging):
+        os.remove(staging)
+
+    conn = sqlite3.connect(staging, isolation_level=None)
+    try:
+        # page size has to be set before the first table is created
+        conn.execute(f"PRAGMA page_size = {page_size}")
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        for statement in statements:
+            conn.execute(statement)
+        for table_name, columns in indexes or []:
+            conn.execute(build_sql_index_statement(table_name, columns))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+        # report the page size the file actually got
+        actual_page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        conn.close()
+        os.chmod(staging, 0o444)
+        os.replace(staging, database)
+    except Exception:
+        # never leave a half-built snapshot next to the live one
+        conn.close()
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+
+    stats = {
+        'build_seconds': round(time.perf_counter() - start, 3),
+        'size_bytes': os.path.getsize(database),
+        'page_size': actual_page_size,
+    }
+    return stats
+
+def open_snapshot(database:str, mmap_size:int=268435456) -> sqlite3.Connection:
+    """Open a snapshot built by build_snapshot for reading. The file is opened read-only and
+    immutable, and is memory-mapped so that queries are served straight from the page cache.
+
+    Args:
+        database (str): SQLite directory of the snapshot, i.e.: snapshot.db
+        mmap_size (int, optional): maximum number of bytes to memory-map. Defaults to 268435456 (256 MiB).
+
+    Returns:
+        class 'sqlite3.Connection': read-only connection to the snapshot
+    """    
+    uri = Path(database).resolve().as_uri() + "?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
 def execute(database:str, query:str):
     """Executor of SQL query on SQLite database
 
@@ -87,8 +196,7 @@ def execute(database:str, query:str):
     Returns:
         class 'sqlite3.Cursor': the outcome of SQL query exeuction
     """    
-    if re.search('.(sqlite|sqlite3|db|db3|s3db|sl3|sql)', database) is None:
-        warnings.warn("Sqlite database filename is recommended to end with .sqlite, .sqlite3, .db, .db3, .s3db, .sl3, .sql")
+    check_sqlite_filename(database)
     try:
         conn = sqlite3.connect(database)
     except sqlite3.Error as e:
@@ -190,7 +298,8 @@ def build_player_universe_value_text(matches:list) -> str:
             player_universe.add(tmp)
 
     result = []
-    for player in player_universe:
+    # sorted by player_id, the primary key of player_universe
+    for player in sorted(player_universe, key=lambda player: player[1]):
         result.append(convert_to_sql_insert_values(player))
 
     return ', '.join(result)
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns});
\ No newline at end of file
@@ -1,9 +1,56 @@
 from functions import *
-import boto3, sys, logging
+import boto3, sys, logging, tempfile
 
 LOGGER = logging.getLogger(__name__)
+
+def build_and_publish_snapshot(snapshot:dict, statements:list) -> dict:
+    """Build the read-optimized SQLite snapshot and, if a bucket is given, upload it to S3
+    so that report consumers can download it and query it locally via open_snapshot.
+
+    Args:
+        snapshot (dict): snapshot settings from the event, supported keys:
+        - filename (str, optional): local path of the snapshot. Defaults to snapshot.db in the temporary directory.
+        - bucket (str, optional): S3 bucket to upload the snapshot to.
+        - key (str, optional): S3 object key of the snapshot. Defaults to the base name of filename.
+        statements (list): SQL queries that create and populate the tables, executed in order.
+
+    Returns:
+        dict: build statistics of the snapshot, plus its S3 location if uploaded
+    """    
+    bucket = snapshot.get('bucket')
+    if bucket:
+        # only the bucket/prefix configured on the stack may be written to
+        prefix = os.environ.get('snapshot_prefix', '')
+        key = snapshot.get('key') or prefix + os.path.basename(snapshot.get('filename') or 'snapshot.db')
+        if bucket != os.environ.get('snapshot_bucket') or not key.startswith(prefix):
+            raise ValueError(f"Snapshot can only be published under the configured snapshot bucket and prefix, got s3://{bucket}/{key}")
+
+    filename = snapshot.get('filename') or os.path.join(tempfile.gettempdir(), 'snapshot.db')
+    stats = build_snapshot(
+        filename,
+        statements,
+        indexes=[
+            ('match_results', ['gender', 'season']),
+            ('innings', ['team']),
+            ('player_universe', ['name'])
+        ]
+    )
+    if bucket:
+        boto3.client('s3').upload_file(filename, bucket, key)
+        stats['location'] = f"s3://{bucket}/{key}"
+        if not snapshot.get('filename'):
+            # free the Lambda's ephemeral storage once the snapshot is published
+            os.remove(filename)
+    return stats
+
 def service(event, environment):
-    env = os.environ['environment']
+    snapshot = event.get('snapshot')
+    if snapshot and not set(snapshot) <= {'filename', 'bucket', 'key'}:
+        LOGGER.error(f"Encountered misconfigured event, unknown snapshot settings: {sorted(set(snapshot) - {'filename', 'bucket', 'key'})}")
+        sys.exit(1)
+    if event.get('snapshot_only') and not snapshot:
+        LOGGER.error("Encountered misconfigured event, snapshot_only requires a snapshot entry")
+        sys.exit(1)
     try:
         female_competition_matches, female_competition_innings = extract_raw_data('https://cricsheet.org/downloads/odis_female_json.zip')
         male_competition_matches, male_competition_innings = extract_raw_data('https://cricsheet.org/downloads/odis_male_json.zip')
@@ -12,6 +59,9 @@ def service(event, environment):
         matches.extend(male_competition_matches)
         innings.extend(female_competition_innings)
         innings.extend(male_competition_innings)
+        # keep the rows in primary key order so that they are bulk-loaded sequentially
+        matches.sort(key=lambda match: match['game_id'])
+        innings.sort(key=lambda inning: (inning['game_id'], inning['innings_order']))
         LOGGER.info("Data was successfully downloaded!")
     except Exception as e:
         LOGGER.error(f"Encountered error when downloading online data, error detail: {e}")
@@ -35,7 +85,57 @@ def service(event, environment):
     except:
         LOGGER.error(f"Encountered error when building table creation queries, error detail: {e}")
         sys.exit(1)
-    
+
+    try:
+        match_value_text, match_columns = build_column_value_text(matches, match_columns)
+        match_result_insert_statement = build_sql_insert_statement(
+            'match_results', match_columns, match_value_text
+            )
+        LOGGER.info('Match_result table insersion queries were successfully created!')
+    except Exception as e:
+        LOGGER.error(f"Encountered error when building match_result table insersion queries, error detail: {e}")
+        sys.exit(1)
+
+    try:   
+        innings_value_text, innings_columns = build_column_value_text(innings, innings_columns)
+        innings_insert_statement = build_sql_insert_statement(
+            'innings', innings_columns, innings_value_text
+        )
+        LOGGER.info('Innings table insersion queries were successfully created!')
+    except Exception as e:
+        LOGGER.error(f"Encountered error when building innings table insersion queries, error detail: {e}")
+        sys.exit(1)
+
+    try:
+        player_universe_insert_statement = build_sql_insert_statement(
+            'player_universe', player_universe_columns, to_insert_player_values
+        )
+        LOGGER.info('Player universe table insersion queries were successfully created!')
+    except Exception as e:
+        LOGGER.error(f"Encountered error when building player_universe table insersion queries, error detail: {e}")
+        sys.exit(1)
+
+    # read-optimized snapshot for report consumers, independent of Aurora
+    if snapshot:
+        try:
+            snapshot_stats = build_and_publish_snapshot(
+                snapshot,
+                [
+                    match_result_create_statement, innings_create_statement, player_universe_create_statement,
+                    match_result_insert_statement, innings_insert_statement, player_universe_insert_statement
+                ]
+            )
+            LOGGER.info("Snapshot was successfully built!", extra=snapshot_stats)
+        except Exception as e:
+            LOGGER.error(f"Encountered error when building the snapshot, error detail: {e}")
+            # the snapshot is an optional extra unless it is the only thing requested
+            if event.get('snapshot_only'):
+                sys.exit(1)
+    if event.get('snapshot_only'):
+        return
+
+    env = os.environ['environment']
+
     # get the ARN of the DB clsuter
     rds_client = boto3.client('rds')
     clusters = rds_client.describe_db_clusters()
@@ -85,35 +185,6 @@ def service(event, environment):
         LOGGER.error(f"Encountered error when creating player_universe table, error detail: {e}")
         sys.exit(1)
 
-    try:
-        match_value_text, match_columns = build_column_value_text(matches, match_columns)
-        match_result_insert_statement = build_sql_insert_statement(
-            'match_results', match_columns, match_value_text
-            )
-        LOGGER.info('Match_result table insersion queries were successfully created!')
-    except Exception as e:
-        LOGGER.error(f"Encountered error when building match_result table insersion queries, error detail: {e}")
-        sys.exit(1)
-
-    try:   
-        innings_value_text, innings_columns = build_column_value_text(innings, innings_columns)
-        innings_insert_statement = build_sql_insert_statement(
-            'innings', innings_columns, innings_value_text
-        )
-        LOGGER.info('Innings table insersion queries were successfully created!')
-    except Exception as e:
-        LOGGER.error(f"Encountered error when building innings table insersion queries, error detail: {e}")
-        sys.exit(1)
-
-    try:
-        player_universe_insert_statement = build_sql_insert_statement(
-            'player_universe', player_universe_columns, to_insert_player_values
-        )
-        LOGGER.info('Player universe table insersion queries were successfully created!')
-    except Exception as e:
-        LOGGER.error(f"Encountered error when building player_universe table insersion queries, error detail: {e}")
-        sys.exit(1)
-
     ## insert
     try:
         _ = rds_data_client.execute_statement(
@@ -152,4 +223,4 @@ def service(event, environment):
         print('Insertions into player_universe table were successfully completed!')
     except Exception as e:
         print(f"Encountered error when inserting into player_universe table, error detail: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,4 +1,4 @@
-import functions
+import functions, pytest
 from functions import *
 
 def test_extract_raw_data(mocker):
@@ -8,6 +8,106 @@ def test_extract_raw_data(mocker):
     assert mock_urlopen.call_count == 1 # numbers of urlopen being called
     assert len(actual_result) == 2 # a tuple of matches and innings
 
+def test_build_snapshot(tmp_path):
+    database = str(tmp_path / 'snapshot.db')
+    statements = [
+        build_sql_create_statement('player_universe', 'name, player_id, gender', ['player_id']),
+        build_sql_insert_statement('player_universe', 'name, player_id, gender', '("A", "1", "female"), ("B", "2", "male")'),
+    ]
+
+    stats = build_snapshot(database, statements, indexes=[('player_universe', ['name'])], page_size=8192)
+    assert stats['size_bytes'] == os.path.getsize(database)
+    assert stats['page_size'] == 8192
+
+    conn = open_snapshot(database)
+    assert conn.execute("PRAGMA page_size").fetchone()[0] == 8192
+    assert conn.execute("SELECT count(*) FROM player_universe").fetchone()[0] == 2
+    assert conn.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0] > 0 # ANALYZEd
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM player_universe") # opened read-only
+    conn.close()
+
+def test_build_snapshot_default_page_size_and_rebuild(tmp_path):
+    database = str(tmp_path / 'snapshot.db')
+    create_statement = build_sql_create_statement('player_universe', 'name, player_id, gender', ['player_id'])
+    build_snapshot(database, [create_statement, build_sql_insert_statement('player_universe', 'name, player_id, gender', '("A", "1", "female")')])
+    assert os.stat(database).st_mode & 0o777 == 0o444
+
+    # an existing read-only snapshot is replaced
+    stats = build_snapshot(database, [create_statement, build_sql_insert_statement('player_universe', 'name, player_id, gender', '("A", "1", "female"), ("B", "2", "male")')])
+    assert stats['page_size'] == 65536
+    conn = open_snapshot(database)
+    assert conn.execute("PRAGMA page_size").fetchone()[0] == 65536
+    assert conn.execute("SELECT count(*) FROM player_universe").fetchone()[0] == 2
+    conn.close()
+
+def test_build_snapshot_failure_cleans_up(tmp_path):
+    database = str(tmp_path / 'snapshot.db')
+    with pytest.raises(sqlite3.OperationalError):
+        build_snapshot(database, ['CREATE TABLE t (a);', 'INSERT INTO missing VALUES (1);'])
+    assert os.listdir(tmp_path) == []
+
+def test_build_snapshot_rejects_unsupported_page_size(tmp_path):
+    database = str(tmp_path / 'snapshot.db')
+    for page_size in [100000, 1000, 256]:
+        with pytest.raises(ValueError):
+            build_snapshot(database, ['CREATE TABLE t (a);'], page_size=page_size)
+    assert os.listdir(tmp_path) == []
+
+def test_service_snapshot_only(tmp_path, monkeypatch):
+    pytest.importorskip('boto3')
+    import service
+    matches = [
+        {'game_id': game_id, 'gender': 'female', 'registry': {'people': {f'player {game_id}': f'id-{game_id}'}}}
+        for game_id in ['3', '1', '2']
+    ]
+    innings = [
+        {'game_id': game_id, 'innings_order': order, 'team': 'A'}
+        for game_id, order in [('2', 2), ('1', 1), ('2', 1)]
+    ]
+    monkeypatch.setattr(service, 'extract_raw_data', lambda hyperlink: (list(matches), list(innings)) if 'female' in hyperlink else ([], []))
+    uploads, clients = [], []
+    class FakeS3Client:
+        def upload_file(self, filename, bucket, key):
+            uploads.append((filename, bucket, key))
+    def fake_client(name):
+        clients.append(name)
+        return FakeS3Client()
+    monkeypatch.setattr(service.boto3, 'client', fake_client)
+    monkeypatch.setenv('snapshot_bucket', 'reports')
+    monkeypatch.setenv('snapshot_prefix', 'cricket/')
+
+    # misconfigured events fail fast without touching Aurora
+    for event in [{'snapshot_only': True}, {'snapshot': {}, 'snapshot_only': True}, {'snapshot': {'buckett': 'reports'}, 'snapshot_only': True}]:
+        with pytest.raises(SystemExit):
+            service.service(event, {})
+    # buckets and prefixes other than the configured ones are refused
+    for snapshot in [{'bucket': 'elsewhere', 'key': 'cricket/snapshot.db'}, {'bucket': 'reports', 'key': 'other/snapshot.db'}]:
+        with pytest.raises(SystemExit):
+            service.service({'snapshot': dict(snapshot, filename=str(tmp_path / 'refused.db')), 'snapshot_only': True}, {})
+    assert clients == [] and uploads == []
+    assert os.listdir(tmp_path) == []
+
+    # the default local copy is removed once it is published
+    monkeypatch.setattr(service.tempfile, 'gettempdir', lambda: str(tmp_path))
+    service.service({'snapshot': {'bucket': 'reports'}, 'snapshot_only': True}, {})
+    assert uploads == [(str(tmp_path / 'snapshot.db'), 'reports', 'cricket/snapshot.db')]
+    assert os.listdir(tmp_path) == []
+    uploads.clear(), clients.clear()
+
+    database = str(tmp_path / 'snapshot.db')
+    service.service({'snapshot': {'filename': database, 'bucket': 'reports', 'key': 'cricket/snapshot.db'}, 'snapshot_only': True}, {})
+    assert clients == ['s3'] # Aurora is never touched
+    assert uploads == [(database, 'reports', 'cricket/snapshot.db')]
+
+    conn = open_snapshot(database)
+    assert conn.execute("PRAGMA page_size").fetchone()[0] == 65536
+    # rows were bulk-loaded in primary key order
+    assert [row[0] for row in conn.execute("SELECT game_id FROM match_results ORDER BY rowid")] == ['1', '2', '3']
+    assert conn.execute("SELECT game_id, innings_order FROM innings ORDER BY rowid").fetchall() == [('1', 1), ('2', 1), ('2', 2)]
+    assert [row[0] for row in conn.execute("SELECT player_id FROM player_universe ORDER BY rowid")] == ['id-1', 'id-2', 'id-3']
+    conn.close()
+
 
 # def calculate(x, y):
 #     return x + y